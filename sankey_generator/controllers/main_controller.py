@@ -6,11 +6,21 @@ from sankey_generator.services.config_service import ConfigService
 from sankey_generator.services.finanzguru_csv_parser_service import FinanzguruCsvParserService
 from sankey_generator.services.sankey_plotter_service import SankeyPlotterService
 from PyQt6.QtWebEngineCore import QWebEngineDownloadRequest
-from PyQt6.QtCore import QDir, QUrl
+from PyQt6.QtCore import QDir, QUrl, Qt, QThreadPool
+from sankey_generator.models.theme import Theme
 from sankey_generator.utils.observer import Observable, ObserverKeys
+from sankey_generator.utils.worker import Worker
+from collections import OrderedDict
 import os
 
 
+# QWebEngineView.setHtml can not display content larger than 2 MB, the limit applies to the percent-encoded data: URL
+MAX_SET_HTML_SIZE = 2 * 1024 * 1024
+SET_HTML_URL_PREFIX = 'data:text/html;charset=UTF-8,'
+# number of generated Sankey diagrams kept for re-use
+MAX_HTML_CACHE_SIZE = 8
+
+
 class MainController(Observable):
     """Controller for the Sankey Generator application."""
 
@@ -28,47 +38,44 @@ class MainController(Observable):
         self.current_diagram_url: QUrl = None
 
         config: Config = self.config_service.config
-        self.current_year: int = config.last_used_year
-        self.current_month: int = config.last_used_month
-        self.current_issue_level: int = config.last_used_issue_level
+        self.current_year: int | None = config.last_used_year
+        self.current_month: int | None = config.last_used_month
+        self.current_issue_level: int | None = config.last_used_issue_level
         self.sankey_generated: bool = False
+        # generated diagrams keyed by (file_mtime, year, month, issue_level, dark_mode)
+        self._html_cache: OrderedDict[tuple, str] = OrderedDict()
+        # worker generating a diagram in the thread pool, and whether to generate again when it is done
+        self._sankey_worker: Worker = None
+        self._sankey_regenerate: bool = False
+        # incremented when the cache is cleared, so results of workers started before are discarded
+        self._html_cache_generation: int = 0
         super().__init__()
 
+    @staticmethod
+    def _parse_int(value: str) -> int | None:
+        """Parse a non-negative integer from an input field, return None for empty or invalid input."""
+        value = (value or '').strip()
+        # isdecimal avoids raising and catching an exception for empty or partially typed input
+        return int(value) if value.isdecimal() else None
+
     def set_year(self, year: str):
-        """Set the last used year."""
-        self.current_year = int(year)
+        """Set the last used year (safely handle empty/invalid input)."""
+        self.current_year = self._parse_int(year)
 
     def set_month(self, month: str):
-        """Set the last used month."""
-        self.current_month = int(month)
-        """Set the last used month (safely handle empty/invalid input and validate 1-12)."""
-        month_str = (month or "").strip()
-        if not month_str:
-            self.current_month = None
-            return
-        try:
-            m = int(month_str)
-            #self.current_month = m if 1 <= m <= 12 else None
-        except ValueError:
-            self.current_month = None
-
+        """Set the last used month (safely handle empty/invalid input)."""
+        self.current_month = self._parse_int(month)
 
     def set_issue_level(self, issue_level: str):
         """Set the last used issue level (safely handle empty/invalid input)."""
-        issue_str = (issue_level or "").strip()
-        if not issue_str:
-            self.current_issue_level = None
-            return
-        try:
-            self.current_issue_level = int(issue_str)
-        except ValueError:
-            self.current_issue_level = None
+        self.current_issue_level = self._parse_int(issue_level)
 
     def _save_last_used_values_to_config(self):
-        """Save the last used values."""
-        self.config_service.save_last_used_year(self.current_year)
-        self.config_service.save_last_used_month(self.current_month)
-        self.config_service.save_last_used_issue_level(self.current_issue_level)
+        """Save the last used values (empty/invalid inputs are saved as 0 like in the default config)."""
+        with self.config_service.batched_save():
+            self.config_service.save_last_used_year(self.current_year or 0)
+            self.config_service.save_last_used_month(self.current_month or 0)
+            self.config_service.save_last_used_issue_level(self.current_issue_level or 0)
 
     def on_toggle_theme(self):
         """Toggle the theme between dark and light mode."""
@@ -96,39 +103,122 @@ class MainController(Observable):
 
     def get_html(self, content: str = '') -> str:
         """Get the HTML content with the given content."""
-        return f'<html><body style="background-color: {self.theme_manager.get_colors()["background"]};">{content}</body></html>'
+        return self.theme_manager.get_html_prefix() + content + '</body></html>'
 
     def create_and_add_sankey(self):
         """Create and add the Sankey diagram to the browser."""
-        fig_html: str = ''
-        if self.sankey_generated:
-            config: Config = self.config_service.config
-            current_year = config.last_used_year
-            current_month = config.last_used_month
-            current_issue_level = config.last_used_issue_level
-            if not current_year or not current_month or not current_issue_level:
-                print("Hoppla")
-                # TODO: Replace with validation -> Disbale button on errors
-                return
-
-            fig_html = self._generate_sankey_html(int(current_year), int(current_month), int(current_issue_level))
-
-        # Save the HTML to a temporary file
-        temp_file = 'temp_plot.html'
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write(self.get_html(fig_html))
-
-        # Load the file in WebView
-        current_diagram_url: QUrl = QUrl.fromLocalFile(os.path.abspath(temp_file))
-        # Notify observers about the new diagram URL
-        self.notify_observers(ObserverKeys.SANKEY_GENERATED, current_diagram_url)
+        if not self.sankey_generated:
+            self._show_sankey_html('')
+            return
+
+        config: Config = self.config_service.config
+        current_year = config.last_used_year
+        current_month = config.last_used_month
+        current_issue_level = config.last_used_issue_level
+        if not current_year or not current_month or not current_issue_level:
+            print("Hoppla")
+            # TODO: Replace with validation -> Disbale button on errors
+            return
+        year, month, issue_level = int(current_year), int(current_month), int(current_issue_level)
+
+        try:
+            key = self._get_html_cache_key(year, month, issue_level)
+        except OSError as error:
+            # e.g. no or a moved input file, exceptions must not escape the Qt slot
+            self.notify_observers(ObserverKeys.ERROR_MESSAGE, f'Could not read the input file: {error}')
+            return
+        fig_html = self._html_cache.get(key)
+        if fig_html is not None:
+            self._html_cache.move_to_end(key)
+            self._show_sankey_html(fig_html)
+            return
+
+        if self._sankey_worker is not None:
+            # a diagram is being generated, generate again with the current values when it is done
+            self._sankey_regenerate = True
+            return
+
+        # Parse and plot in the thread pool to keep the UI responsive, the results are queued back to the GUI thread.
+        # The theme colors are taken here, so a theme toggle during the generation can not mix into the result.
+        generation = self._html_cache_generation
+        self._sankey_worker = Worker(self._generate_sankey_html, year, month, issue_level, dict(Theme.get_colors()))
+        self._sankey_worker.signals.finished.connect(
+            lambda fig_html: self._on_sankey_html_generated(key, generation, fig_html), Qt.ConnectionType.QueuedConnection
+        )
+        self._sankey_worker.signals.failed.connect(self._on_sankey_generation_failed, Qt.ConnectionType.QueuedConnection)
+        self.notify_observers(ObserverKeys.SANKEY_GENERATION_RUNNING, True)
+        QThreadPool.globalInstance().start(self._sankey_worker)
+
+    def _show_sankey_html(self, fig_html: str) -> None:
+        """Show the given Sankey diagram HTML in the browser."""
+        html: str = self.get_html(fig_html)
+        if len(SET_HTML_URL_PREFIX) + QUrl.toPercentEncoding(html).size() < MAX_SET_HTML_SIZE:
+            # Notify observers about the new diagram HTML, it is loaded from memory
+            self.notify_observers(ObserverKeys.SANKEY_GENERATED, html)
+        else:
+            # Too large for setHtml, save the HTML to a temporary file and load the file in WebView
+            temp_file = 'temp_plot.html'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(html)
+            current_diagram_url: QUrl = QUrl.fromLocalFile(os.path.abspath(temp_file))
+            self.notify_observers(ObserverKeys.SANKEY_GENERATED, current_diagram_url)
 
         print(
             f'Generating Sankey diagram for {self.current_year}-{self.current_month} with issue level {self.current_issue_level}'
         )
         self.notify_observers(ObserverKeys.INFO_MESSAGE, 'Sankey diagram generated successfully.')
 
-    def _generate_sankey_html(self, year, month, issue_level) -> str:
+    def _on_sankey_html_generated(self, key: tuple, generation: int, fig_html: str) -> None:
+        """Cache and show the diagram generated by the worker, unless the values, theme or filters changed in the meantime."""
+        if generation != self._html_cache_generation or key != self._get_current_html_cache_key():
+            # outdated, generate the diagram for the current values instead
+            self._sankey_regenerate = True
+            self._finish_sankey_generation()
+            return
+
+        self._html_cache[key] = fig_html
+        if len(self._html_cache) > MAX_HTML_CACHE_SIZE:
+            self._html_cache.popitem(last=False)
+
+        self._show_sankey_html(fig_html)
+        self._finish_sankey_generation()
+
+    def _on_sankey_generation_failed(self, message: str) -> None:
+        """Report an error of the worker."""
+        self.notify_observers(ObserverKeys.ERROR_MESSAGE, f'Sankey diagram generation failed: {message}')
+        self._finish_sankey_generation()
+
+    def _finish_sankey_generation(self) -> None:
+        """Release the worker and generate again if the values changed in the meantime."""
+        self._sankey_worker = None
+        self.notify_observers(ObserverKeys.SANKEY_GENERATION_RUNNING, False)
+        if self._sankey_regenerate:
+            self._sankey_regenerate = False
+            self.create_and_add_sankey()
+
+    def _get_html_cache_key(self, year: int, month: int, issue_level: int) -> tuple:
+        """Get the key of a generated diagram, the plot colors depend on the theme so it is part of the key."""
+        return (
+            os.path.getmtime(self.finanzguru_parser_service.file_path),
+            year,
+            month,
+            issue_level,
+            Theme.dark_mode,
+        )
+
+    def _get_current_html_cache_key(self) -> tuple:
+        """Get the cache key for the last used values, None if they are incomplete or the input file is not readable."""
+        config: Config = self.config_service.config
+        if not config.last_used_year or not config.last_used_month or not config.last_used_issue_level:
+            return None
+        try:
+            return self._get_html_cache_key(
+                int(config.last_used_year), int(config.last_used_month), int(config.last_used_issue_level)
+            )
+        except OSError:
+            return None
+
+    def _generate_sankey_html(self, year, month, issue_level, theme_colors: dict) -> str:
         """Generate the Sankey diagram for the given year, month and issue level."""
         print("HHUUHU")
         # Parse CSV and plot Sankey diagram
@@ -139,12 +229,21 @@ class MainController(Observable):
         )
 
         # Generate the interactive Sankey diagram as an HTML div
-        fig_html = self.sankey_plotter_service.get_sankey_html(income_node, year, month)
+        fig_html = self.sankey_plotter_service.get_sankey_html(income_node, year, month, theme_colors)
 
         print('Sankey generated')
 
         return fig_html
 
+    def clear_sankey_cache(self) -> None:
+        """Forget the generated Sankey diagrams, e.g. after the filters were changed."""
+        self._html_cache.clear()
+        self._html_cache_generation += 1
+
+    def get_base_url(self) -> QUrl:
+        """Get the base URL for resolving relative paths in HTML loaded from memory."""
+        return QUrl.fromLocalFile(QDir.currentPath() + '/')
+
     def on_download_requested(self, download_item: QWebEngineDownloadRequest) -> None:
         """Handle download requests."""
         download_path = QDir.currentPath() + '/output_files'
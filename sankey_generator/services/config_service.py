@@ -1,15 +1,48 @@
 """Service to handle the configuration data for the Sankey Generator."""
 
 import json
+from contextlib import contextmanager
 from sankey_generator.models.config import Config, DataFrameFilter, AccountSource, IssueCategory, IncomeFilter
+from sankey_generator.utils.file_writer import write_file_atomically
 import os
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _load_json(file) -> dict:
+    """Load JSON from a file opened in binary mode, using orjson if available."""
+    if orjson is not None:
+        return orjson.loads(file.read())
+    return json.load(file)
+
+
+def _dumps_json(data: dict) -> bytes:
+    """Serialize JSON to bytes, using orjson if available."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode('utf-8')
+
+
+def _dump_json(data: dict, file) -> None:
+    """Dump JSON to a file opened in binary mode, using orjson if available."""
+    file.write(_dumps_json(data))
+
 
 class ConfigService:
     """Store the configuration data for the Sankey Generator."""
 
     def __init__(self, config_file):
         """Initialize the configuration data."""
+        self.config_file: str = config_file
+        # serialized config, only the changed keys are updated when saving single values
+        self._config_dict: dict = None
+        # nesting depth of batched saves and whether a write was suppressed during the batch
+        self._batch_depth: int = 0
+        self._dirty: bool = False
+
         # chek if the config file exists
         if not os.path.exists(config_file):
             # create a default config file
@@ -31,11 +64,11 @@ class ConfigService:
                 'last_used_issue_level': 0,
                 'dark_mode': False,
             }
-            with open(config_file, 'w') as file:
-                json.dump(default_config, file, indent=4)
+            with open(config_file, 'wb') as file:
+                _dump_json(default_config, file)
 
-        with open(config_file, 'r') as file:
-            config_data = json.load(file)
+        with open(config_file, 'rb') as file:
+            config_data = _load_json(file)
 
         self.config: Config = Config(
             input_file=config_data['input_file'],
@@ -88,20 +121,55 @@ class ConfigService:
 
         return issue_category
 
+    def _write_config(self) -> None:
+        """Write the serialized configuration atomically to the config file (or defer it during a batch)."""
+        if self._batch_depth > 0:
+            self._dirty = True
+            return
+        self._dirty = False
+
+        write_file_atomically(self.config_file, _dumps_json(self._config_dict))
+
     def _save_config(self):
         """Save the configuration data to the config file."""
-        with open('config.json', 'w') as file:
-            json.dump(self.config.to_dict(), file, indent=4)
+        self._config_dict = self.config.to_dict()
+        self._write_config()
+
+    def _save_value(self, key: str, new_value, serialized_value) -> None:
+        """Save a single value, only updating its key in the serialized configuration."""
+        setattr(self.config, key, new_value)
+        if self._config_dict is None:
+            self._save_config()
+            return
+        self._config_dict[key] = serialized_value
+        self._write_config()
 
     def _save_string_value(self, key: str, new_value: str) -> None:
         """Save a string value to the config file."""
-        setattr(self.config, key, new_value)
-        self._save_config()
+        self._save_value(key, new_value, new_value)
 
     def _save_int_value(self, key: str, new_value: int) -> None:
         """Save an integer value to the config file."""
-        setattr(self.config, key, new_value)
-        self._save_config()
+        self._save_value(key, new_value, int(new_value))
+
+    def begin_batch(self) -> None:
+        """Start a batch of changes, the config file is only written once at the end of the batch."""
+        self._batch_depth += 1
+
+    def end_batch(self) -> None:
+        """End a batch of changes and write the config file if anything changed."""
+        self._batch_depth -= 1
+        if self._batch_depth == 0 and self._dirty:
+            self._write_config()
+
+    @contextmanager
+    def batched_save(self):
+        """Context manager to save all changes made inside of it with a single write."""
+        self.begin_batch()
+        try:
+            yield self
+        finally:
+            self.end_batch()
 
     def save_dark_mode(self, dark_mode: bool) -> None:
         """Save the dark mode value to the config file."""
@@ -1,10 +1,21 @@
 """Finanzguru CSV parser."""
 
+import os
+import re
+import numpy as np
 import pandas as pd
 from sankey_generator.models.sankey_node import SankeyNode
 from sankey_generator.models.sankey_income_node import SankeyRootNode
 from sankey_generator.models.config import DataFrameFilter, AccountSource, IssueCategory
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pacsv
+except ImportError:
+    pa = None
+    pacsv = None
+
 
 class FinanzguruCsvParserService:
     """Finanzguru CSV parser."""
@@ -27,22 +38,122 @@ class FinanzguruCsvParserService:
         self.amount_out_name = amount_out_name
         self.other_income_name = other_income_name
         self.not_used_income_name = not_used_income_name
+        # parsed CSV file keyed by (file_path, mtime, used_columns), so changing year/month/issue level does not re-read the file
+        self._csv_cache: dict[tuple[str, float, frozenset[str]], pa.Table | pd.DataFrame] = {}
+        # prepared data of the already analysed periods keyed by (file_path, mtime, used_columns, year, month)
+        self._df_cache: dict[tuple[str, float, frozenset[str], int, int], pd.DataFrame] = {}
+
+    def _get_lower_column(self, df: pd.DataFrame, column: str) -> pd.Series:
+        """Return the lowercased column, using the one precomputed when reading the CSV if available."""
+        lower_column = f'__{column}_lower'
+        if lower_column in df.columns:
+            return df[lower_column]
+        return df[column].str.lower()
+
+    def _get_mask_for_values_in_column(self, df: pd.DataFrame, column: str, values_filter: list[str]) -> np.ndarray:
+        """Return a boolean mask of the rows where 'column' contains any of 'values_filter' (case insensitive)."""
+        if not values_filter:
+            return np.zeros(len(df), dtype=bool)
+        pattern = '|'.join(re.escape(value.lower()) for value in values_filter)
+        lower = self._get_lower_column(df, column)
+        if isinstance(lower.dtype, pd.CategoricalDtype):
+            # match the distinct categories only and look the result up by code (code -1 is a missing value)
+            matched_categories = lower.cat.categories.astype(str).str.contains(pattern, regex=True)
+            return np.append(np.asarray(matched_categories, dtype=bool), False)[lower.cat.codes.to_numpy()]
+        return lower.str.contains(pattern, regex=True, na=False).to_numpy(dtype=bool)
+
+    def _get_income_filter_columns(self) -> set[str]:
+        """Return the CSV columns referenced by the income filters."""
+        return {
+            income_filter.csv_column_name
+            for income_source in self.income_sources
+            for income_filter in income_source.income_filters
+        }
+
+    def _get_category_columns(self) -> set[str]:
+        """Return the CSV columns used for grouping and filtering (issues hierarchy and all filters)."""
+        columns = self._get_income_filter_columns()
+        for data_frame_filter in self.income_data_frame_fitlers + self.issues_data_frame_fitlers:
+            columns.add(data_frame_filter.csv_column_name)
+        columns.update(self._hierarchy_columns)
+        return columns
+
+    def _get_used_columns(self) -> frozenset[str]:
+        """Return all CSV columns the parser uses, the other columns are not read at all."""
+        return frozenset(
+            {self.analysis_year_column_name, self.analysis_month_column_name, self.amount_out_name} | self._get_category_columns()
+        )
+
+    def _read_csv(self, file_path: str, mtime: float, used_columns: frozenset[str]) -> 'pa.Table | pd.DataFrame':
+        """Read the used columns of the Finanzguru CSV file, reusing the parsed data as long as the file and columns are unchanged."""
+        key = (file_path, mtime, used_columns)
+        source = self._csv_cache.get(key)
+        if source is None:
+            if pacsv is not None:
+                # pyarrow parses multithreaded in C++ into compact columnar buffers, empty cells become null like with pandas
+                source = pacsv.read_csv(
+                    file_path,
+                    parse_options=pacsv.ParseOptions(delimiter=';'),
+                    convert_options=pacsv.ConvertOptions(
+                        decimal_point=',',
+                        strings_can_be_null=True,
+                        column_types={self.analysis_month_column_name: pa.string()},
+                        include_columns=list(used_columns),
+                    ),
+                )
+            else:
+                source = pd.read_csv(
+                    file_path,
+                    sep=';',
+                    decimal=',',
+                    engine='c',
+                    low_memory=False,
+                    cache_dates=True,
+                    usecols=list(used_columns),
+                )
+
+            # only keep the latest version of the file
+            self._csv_cache.clear()
+            self._df_cache.clear()
+            self._csv_cache[key] = source
+        return source
+
+    def _filter_by_date(self, source: 'pa.Table | pd.DataFrame', year: int, month: int) -> pd.DataFrame:
+        """Filter the parsed CSV data to the given year (month 13) or month."""
+        if pacsv is not None:
+            # filter on the arrow table, so only the relevant rows are converted to pandas
+            if month == 13:
+                expression = pc.field(self.analysis_year_column_name) == year
+            else:
+                expression = pc.field(self.analysis_month_column_name) == f'{year}-{month:02d}'
+            return source.filter(expression).to_pandas(split_blocks=True, self_destruct=True)
+
+        if month == 13:
+            return source.loc[(source[self.analysis_year_column_name] == year)].copy()
+        return source.loc[(source[self.analysis_month_column_name] == f'{year}-{month:02d}')].copy()
+
+    def _prepare_data_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Normalize the amounts, fill empty cells and convert the filter columns for fast filtering and grouping."""
+        # normalize the amount column once ("1.234,56" -> 1234.56) instead of on every sum
+        amount = df[self.amount_out_name]
+        if not pd.api.types.is_numeric_dtype(amount):
+            amount = amount.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+        df[self.amount_out_name] = amount.astype('float64').fillna(0)
+
+        # fill all empty cells in each column with "empty"
+        df = df.fillna('empty')
+
+        # lowercase the columns used by the income filters once, they are matched case insensitive
+        for column in self._get_income_filter_columns():
+            if column in df.columns:
+                df[f'__{column}_lower'] = df[column].astype(str).str.lower().astype('category')
+
+        # grouping and filtering on categoricals works on integer codes instead of python strings
+        for column in self._get_category_columns():
+            if column in df.columns:
+                df[column] = df[column].astype('category')
 
-    def _get_sum(self, df: pd.DataFrame) -> float:
-        """Return the sum of column in the DataFrame."""
-        df = df.str.replace('.', '').str.replace(',', '.').astype(float)
-        sum = df.sum()
-        if sum < 0:
-            sum = sum * -1
-        return sum
-
-    def _get_sum_for_value_in_column(self, df: pd.DataFrame, column: str, values_filter: list[str]) -> float:
-        """Return the sum of the column in the DataFrame where the 'column' contains 'value_lowercase'."""
-        sum = 0
-        for value in values_filter:
-            filtered_df = df.loc[(df[column].str.lower().str.contains(value.lower())), self.amount_out_name]
-            sum = sum + self._get_sum(filtered_df)
-        return sum
+        return df
 
     def _get_relevant_data_from_csv(
         self,
@@ -51,35 +162,44 @@ class FinanzguruCsvParserService:
         month: int,
     ) -> pd.DataFrame:
         """Get relevant data from the Finanzguru CSV file."""
-        df = pd.read_csv(file_path, sep=';', decimal=',')
-
-        # fill all empty cells in each column with "empty"
-        df = df.fillna('empty')
-
-        if month == 13:
-            df = df.loc[(df[self.analysis_year_column_name] == year)]
-            print("Here")
-        else:
-            df = df.loc[(df[self.analysis_month_column_name] == f'{year}-{month:02d}')]
-
+        mtime = os.path.getmtime(file_path)
+        # the filters can be changed in the config window, so the used columns are part of the cache keys
+        used_columns = self._get_used_columns()
+        key = (file_path, mtime, used_columns, year, month)
+        df = self._df_cache.get(key)
+        if df is None:
+            source = self._read_csv(file_path, mtime, used_columns)
+            df = self._prepare_data_frame(self._filter_by_date(source, year, month))
+            self._df_cache[key] = df
         return df
 
+    def _get_data_frame_filters_mask(self, df: pd.DataFrame, data_frame_filters: list[DataFrameFilter]) -> np.ndarray:
+        """Return a boolean mask of the rows matching all data frame filters, so the DataFrame is only sliced once."""
+        mask = np.ones(len(df), dtype=bool)
+        for data_frame_filter in data_frame_filters:
+            mask &= df[data_frame_filter.csv_column_name].isin(data_frame_filter.csv_value_filters).to_numpy()
+        return mask
+
     def _create_income_nodes(self, df: pd.DataFrame, income_accounts: list[AccountSource]) -> list[SankeyNode]:
         """Create income nodes from the income DataFrame and income sources."""
-        income_df: pd.DataFrame = df
-        for data_frame_filter in self.income_data_frame_fitlers:
-            income_df = income_df.loc[df[data_frame_filter.csv_column_name].isin(data_frame_filter.csv_value_filters)]
-
-        income_nodes: list[SankeyNode] = []
-        for income_source in income_accounts:
-            for income_filter in income_source.income_filters:
-                sum = self._get_sum_for_value_in_column(
-                    income_df, income_filter.csv_column_name, income_filter.csv_value_filters
-                )
-                income_nodes.append(SankeyNode(sum, income_filter.sankey_label))
+        income_df: pd.DataFrame = df.loc[self._get_data_frame_filters_mask(df, self.income_data_frame_fitlers)]
+
+        income_filters = [income_filter for income_source in income_accounts for income_filter in income_source.income_filters]
+
+        # one column per income filter, all sums are computed in a single reduction
+        masks = np.zeros((len(income_df), len(income_filters)), dtype=bool)
+        for index, income_filter in enumerate(income_filters):
+            masks[:, index] = self._get_mask_for_values_in_column(
+                income_df, income_filter.csv_column_name, income_filter.csv_value_filters
+            )
+        sums = np.abs(income_df[self.amount_out_name].to_numpy(dtype='float64') @ masks)
+
+        income_nodes: list[SankeyNode] = [
+            SankeyNode(float(sum), income_filter.sankey_label) for income_filter, sum in zip(income_filters, sums, strict=True)
+        ]
 
         # add other income to income_nodes
-        sum_other_income = self._get_sum(income_df[self.amount_out_name])
+        sum_other_income = float(abs(income_df[self.amount_out_name].to_numpy(dtype='float64', copy=False).sum()))
         for node in income_nodes:
             sum_other_income -= node.amount
 
@@ -89,18 +209,14 @@ class FinanzguruCsvParserService:
     def _create_all_issue_nodes(
         self,
         df: pd.DataFrame,
-        issue_category: IssueCategory,
-        used_category_names: list[str],
+        used_category_names: set[str],
         issue_depth: int,
     ) -> list[SankeyNode]:
         """Create all issue nodes from the issues DataFrame and main categories."""
-        issues_df: pd.DataFrame = df
-        for data_frame_filter in self.issues_data_frame_fitlers:
-            issues_df = issues_df.loc[df[data_frame_filter.csv_column_name].isin(data_frame_filter.csv_value_filters)]
+        issues_df: pd.DataFrame = df.loc[self._get_data_frame_filters_mask(df, self.issues_data_frame_fitlers)]
 
         return self._create_issue_nodes(
             issues_df,
-            issue_category,
             used_category_names,
             issue_depth,
         )
@@ -108,39 +224,44 @@ class FinanzguruCsvParserService:
     def _create_issue_nodes(
         self,
         issues_df: pd.DataFrame,
-        issue_category: IssueCategory,
-        used_category_names: list[str],
+        used_category_names: set[str],
         issue_depth: int,
     ) -> list[SankeyNode]:
         """Create issue nodes from the issues DataFrame and main categories."""
-        issue_nodes: list[SankeyNode] = []
-        if issue_category is None:
-            return issue_nodes
-        if issue_depth < 1:
-            return issue_nodes
+        hierarchy_columns = self._hierarchy_columns[:issue_depth]
+        if not hierarchy_columns:
+            return []
 
-        issues_current_category = issues_df[issue_category.csv_column_name].unique()
-        for category in issues_current_category:
-            sum = self._get_sum_for_value_in_column(issues_df, issue_category.csv_column_name, [category])
+        # one groupby per level on the widening key (main category, sub category, ...) sums the amounts of all categories,
+        # the children of a category are the keys of the next level starting with the key of the category
+        sums: dict[tuple, float] = {}
+        children: dict[tuple, list[tuple]] = {(): []}
+        for level in range(len(hierarchy_columns)):
+            level_sums = issues_df.groupby(list(hierarchy_columns[: level + 1]), sort=False, observed=True)[self.amount_out_name].sum().abs()
+            for key, amount in level_sums.items():
+                key = key if isinstance(key, tuple) else (key,)
+                sums[key] = float(amount)
+                children[key] = []
+                children[key[:-1]].append(key)
 
-            if category in used_category_names:
+        # build the nodes depth first, so the used category names are checked in the same order as the diagram is read
+        issue_nodes: list[SankeyNode] = []
+        stack: list[tuple[tuple, SankeyNode | None]] = [(key, None) for key in reversed(children[()])]
+        while stack:
+            key, parent_node = stack.pop()
+            label = key[-1]
+            if label in used_category_names:
                 # add a invisible space to the category name to avoid circular reference
-                category = f' {category}'
-
-            current_category_node = SankeyNode(sum, category)
+                label = f' {label}'
+            used_category_names.add(label)
 
-            category_df = issues_df.loc[
-                issues_df[issue_category.csv_column_name].str.lower().str.contains(category.lower())
-            ]
+            current_category_node = SankeyNode(sums[key], label)
+            if parent_node is None:
+                issue_nodes.append(current_category_node)
+            else:
+                parent_node.add_linked_node(current_category_node)
 
-            used_category_names.append(category)
-            sub_nodes = self._create_issue_nodes(
-                category_df, issue_category.sub_category, used_category_names, issue_depth - 1
-            )
-            for sub_node in sub_nodes:
-                current_category_node.add_linked_node(sub_node)
-
-            issue_nodes.append(current_category_node)
+            stack.extend((child_key, current_category_node) for child_key in reversed(children[key]))
         return issue_nodes
 
     def configure_parser(
@@ -156,6 +277,14 @@ class FinanzguruCsvParserService:
         self.income_data_frame_fitlers = income_data_frame_fitlers
         self.issues_data_frame_fitlers = issues_data_frame_fitlers
 
+        # flatten the linked issue categories once into the CSV columns of the hierarchy levels
+        hierarchy_columns: list[str] = []
+        issue_category = self.issues_hierarchy
+        while issue_category is not None:
+            hierarchy_columns.append(issue_category.csv_column_name)
+            issue_category = issue_category.sub_category
+        self._hierarchy_columns: tuple[str, ...] = tuple(hierarchy_columns)
+
     def parse_csv(
         self,
         year: int,
@@ -183,8 +312,8 @@ class FinanzguruCsvParserService:
         root_node.add_incomes(self._create_income_nodes(df, self.income_sources))
 
         # We need to know all used category names because sankey plot will add a circular reference if node name is ussed multiple times
-        used_category_names: list[str] = []
-        root_node.add_issues(self._create_all_issue_nodes(df, self.issues_hierarchy, used_category_names, issue_depth))
+        used_category_names: set[str] = set()
+        root_node.add_issues(self._create_all_issue_nodes(df, used_category_names, issue_depth))
 
         # not used income
         unused_income = root_node.get_income_amount() - root_node.get_issues_amount()
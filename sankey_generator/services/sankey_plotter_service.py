@@ -1,12 +1,20 @@
 """SankeyPlotter class."""
 
+import plotly
 import plotly.graph_objects as go
 import random
-import plotly.io as pio
+import os
+from plotly.offline import get_plotlyjs
 
 from sankey_generator.models.sankey_income_node import SankeyRootNode
 from sankey_generator.models.sankey_node import SankeyNode
 from sankey_generator.models.theme import Theme
+from sankey_generator.utils.file_writer import write_file_atomically
+
+
+# plotly.js bundle written once next to the generated pages, relative to the working directory (the base URL of the browser)
+PLOTLY_JS_FILE = f'plotly-{plotly.__version__}.min.js'
+SANKEY_DIV_ID = 'sankey-diagram'
 
 
 class SankeyPlotterService:
@@ -15,6 +23,8 @@ class SankeyPlotterService:
     def __init__(self, amount_out_name: str):
         """Initialize the SankeyPlotter."""
         self.amount_out_name = amount_out_name
+        # HTML around the figure JSON, created on the first plot
+        self._html_template: tuple[str, str] = None
 
     def _add_nodes_to_sankey(
         self,
@@ -75,7 +85,7 @@ class SankeyPlotterService:
         for issueNode in income_node.issueNodes:
             self._add_nodes_to_sankey(issueNode, labels, source, target, values, colors, node_index)
 
-    def _get_sankey_fig(self, income_node: SankeyRootNode, year: int, month: int) -> go.Figure:
+    def _get_sankey_fig(self, income_node: SankeyRootNode, year: int, month: int, theme_colors: dict) -> go.Figure:
         """Get the sankey diagram Figure."""
         labels: list[str] = []
         source: list[int] = []
@@ -109,8 +119,8 @@ class SankeyPlotterService:
             ]
         )
 
-        background_color = Theme.get_colors()['background']
-        font_color = Theme.get_colors()['primary']
+        background_color = theme_colors['background']
+        font_color = theme_colors['primary']
 
         fig.update_layout(
             hovermode='x',
@@ -122,7 +132,27 @@ class SankeyPlotterService:
 
         return fig
 
-    def get_sankey_html(self, income_node: SankeyRootNode, year: int, month: int) -> str:
-        """Plot the sankey diagram and return it as an HTML div."""
-        fig = self._get_sankey_fig(income_node, year, month)
-        return pio.to_html(fig, full_html=False)
+    def _get_html_template(self) -> tuple[str, str]:
+        """Get the HTML before and after the figure JSON, the static plotly.js bundle is only written once."""
+        if self._html_template is None:
+            plotly_js = get_plotlyjs().encode('utf-8')
+            # rewrite a missing or truncated bundle, atomically so an interrupted write never leaves a partial file
+            if not os.path.exists(PLOTLY_JS_FILE) or os.path.getsize(PLOTLY_JS_FILE) != len(plotly_js):
+                write_file_atomically(PLOTLY_JS_FILE, plotly_js)
+
+            self._html_template = (
+                f'<script src="{PLOTLY_JS_FILE}"></script>'
+                f'<div id="{SANKEY_DIV_ID}" class="plotly-graph-div" style="height:100%; width:100%;"></div>'
+                '<script>var figure = ',
+                f'; Plotly.newPlot("{SANKEY_DIV_ID}", figure.data, figure.layout, {{"responsive": true}});</script>',
+            )
+        return self._html_template
+
+    def get_sankey_html(self, income_node: SankeyRootNode, year: int, month: int, theme_colors: dict = None) -> str:
+        """Plot the sankey diagram and return it as an HTML div (with the given theme colors, default the current theme)."""
+        if theme_colors is None:
+            theme_colors = Theme.get_colors()
+        fig = self._get_sankey_fig(income_node, year, month, theme_colors)
+        html_prefix, html_suffix = self._get_html_template()
+        # only the figure JSON changes between plots, plotly.js is loaded from the file
+        return html_prefix + fig.to_json() + html_suffix
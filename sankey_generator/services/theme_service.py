@@ -10,14 +10,28 @@ class ThemeService:
     def __init__(self, config_service):
         """Initialize the theme manager."""
         self.config_service: ConfigService = config_service
+        # stylesheets and html prefixes per theme, keyed by Theme.dark_mode
+        self._stylesheets: dict[bool, str] = {}
+        self._html_prefixes: dict[bool, str] = {}
 
     def get_stylesheet(self) -> str:
         """Apply the current theme to the given window."""
-        colors = Theme.get_colors()
-        with open('sankey_generator/resources/theme.qss', 'r') as file:
-            stylesheet = file.read().format(**colors)
+        stylesheet = self._stylesheets.get(Theme.dark_mode)
+        if stylesheet is None:
+            colors = Theme.get_colors()
+            with open('sankey_generator/resources/theme.qss', 'r') as file:
+                stylesheet = file.read().format(**colors)
+            self._stylesheets[Theme.dark_mode] = stylesheet
         return stylesheet
 
+    def get_html_prefix(self) -> str:
+        """Get the start of an HTML page with the background color of the current theme."""
+        html_prefix = self._html_prefixes.get(Theme.dark_mode)
+        if html_prefix is None:
+            html_prefix = f'<html><body style="background-color: {Theme.get_colors()["background"]};">'
+            self._html_prefixes[Theme.dark_mode] = html_prefix
+        return html_prefix
+
     def get_colors(self) -> dict:
         """Get the current theme colors."""
         return Theme.get_colors()
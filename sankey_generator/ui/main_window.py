@@ -35,9 +35,16 @@ class MainWindow(QMainWindow, UiObservableBaseWindow):
         """Update method for the observer pattern."""
         super().updateObservable(observable, *args, **kwargs)
         if observable == self.controller:
-            if args[0] == ObserverKeys.SANKEY_GENERATED and isinstance(args[1], QUrl):
+            if args[0] == ObserverKeys.SANKEY_GENERATED and isinstance(args[1], str):
                 # Update the browser with the new HTML content
+                self.diagram_browser.setHtml(args[1], self.controller.get_base_url())
+            elif args[0] == ObserverKeys.SANKEY_GENERATED and isinstance(args[1], QUrl):
+                # Update the browser with the HTML file (content too large for setHtml)
                 self.diagram_browser.setUrl(args[1])
+            elif args[0] == ObserverKeys.SANKEY_GENERATION_RUNNING and isinstance(args[1], bool):
+                # Only allow one generation at a time, and no filter changes while the worker reads the filters
+                self.generate_button.setEnabled(not args[1])
+                self.config_button.setEnabled(not args[1])
             elif args[0] == ObserverKeys.THEME_CHANGED and isinstance(args[1], str):
                 # Update the theme
                 self.setStyleSheet(args[1])
@@ -95,9 +102,9 @@ class MainWindow(QMainWindow, UiObservableBaseWindow):
         input_layout.addLayout(horizontal_layout)
 
         # Add a button to open the Config Window
-        config_button = QPushButton('Configure Filters', self)
-        config_button.clicked.connect(self.open_config_window)
-        self.layout.addWidget(config_button)
+        self.config_button = QPushButton('Configure Filters', self)
+        self.config_button.clicked.connect(self.open_config_window)
+        self.layout.addWidget(self.config_button)
 
         # Add input layout to the main layout
         self.layout.addLayout(input_layout, stretch=1)
@@ -147,4 +154,7 @@ class MainWindow(QMainWindow, UiObservableBaseWindow):
         config_controller: ConfigController = ConfigController(self.controller.config_service)
         config_window = ConfigWindow(config_controller)
         config_controller.add_observer(config_window)
+        # the filters are edited in place while the window is open, so previously generated diagrams are outdated.
+        # Clear before exec, so results delivered in its event loop are discarded as well.
+        self.controller.clear_sankey_cache()
         config_window.exec()
@@ -0,0 +1,23 @@
+"""Helper to write files atomically."""
+
+import os
+import stat
+import threading
+
+
+def write_file_atomically(file_path: str, data: bytes) -> None:
+    """Write the data to a temporary file next to 'file_path' and move it into place, so readers never see a partial file."""
+    temp_file_path = f'{file_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    # created with 0o666 like open() does, so the umask is honoured instead of tempfile's 0o600
+    file_descriptor = os.open(temp_file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(file_descriptor, 'wb') as file:
+            file.write(data)
+        if os.path.exists(file_path):
+            # keep the permissions of the file being replaced
+            os.chmod(temp_file_path, stat.S_IMODE(os.stat(file_path).st_mode))
+        os.replace(temp_file_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+        raise
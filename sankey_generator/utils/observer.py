@@ -6,7 +6,8 @@ class ObserverKeys:
 
     THEME_CHANGED = 'theme'
     SANKEY_GENERATED = 'sankey_generated'
-    OBSERVER_KEYS_MAIN_WINDOW = {THEME_CHANGED, SANKEY_GENERATED}
+    SANKEY_GENERATION_RUNNING = 'sankey_generation_running'
+    OBSERVER_KEYS_MAIN_WINDOW = {THEME_CHANGED, SANKEY_GENERATED, SANKEY_GENERATION_RUNNING}
 
     ISSUES_FITLERS_CHANGED = 'issues_filters_changed'
     INCOME_FITLERS_CHANGED = 'income_filters_changed'
@@ -20,32 +21,30 @@ class ObserverKeys:
     CLOSE_WINDOW = 'close_window'
     OBSERVER_KEYS_WINDOW = {CLOSE_WINDOW}
 
+    ALL_OBSERVER_KEYS = frozenset(OBSERVER_KEYS_MAIN_WINDOW | OBSERVER_KEYS_CONFIG_WINDOW | OBSERVER_KEYS_MESSAGE_BOX | OBSERVER_KEYS_WINDOW)
+
 
 class Observable:
     """Observable class to be used as a base class for any observable object."""
 
     def __init__(self):
-        """Initialize the observable with an empty list of observers."""
-        self.observers: list[Observer] = []
+        """Initialize the observable with an empty tuple of observers."""
+        # immutable, so notifying is not affected by observers being added or removed during an update
+        self.observers: tuple[Observer, ...] = ()
 
     def add_observer(self, observer):
-        """Add an observer to the list of observers."""
+        """Add an observer to the observers."""
         if observer not in self.observers:
-            self.observers.append(observer)
+            self.observers += (observer,)
 
     def remove_observer(self, observer):
-        """Remove an observer from the list of observers."""
+        """Remove an observer from the observers."""
         if observer in self.observers:
-            self.observers.remove(observer)
+            self.observers = tuple(current for current in self.observers if current is not observer)
 
     def notify_observers(self, *args, **kwargs):
         """Notify all observers about an event."""
-        if (
-            args[0] not in ObserverKeys.OBSERVER_KEYS_MAIN_WINDOW
-            and args[0] not in ObserverKeys.OBSERVER_KEYS_MESSAGE_BOX
-            and args[0] not in ObserverKeys.OBSERVER_KEYS_WINDOW
-            and args[0] not in ObserverKeys.OBSERVER_KEYS_CONFIG_WINDOW
-        ):
+        if args[0] not in ObserverKeys.ALL_OBSERVER_KEYS:
             raise ValueError(f'Unknown observable: {args[0]}')
         for observer in self.observers:
             observer.updateObservable(self, *args, **kwargs)
@@ -0,0 +1,31 @@
+"""Worker to run a function in the global thread pool."""
+
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+
+class WorkerSignals(QObject):
+    """Signals emitted by a worker, QRunnable itself can not emit signals."""
+
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class Worker(QRunnable):
+    """Run a function in a background thread and emit its result or error message."""
+
+    def __init__(self, function, *args, **kwargs):
+        """Initialize the worker with the function and its arguments."""
+        super().__init__()
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.signals: WorkerSignals = WorkerSignals()
+
+    def run(self):
+        """Run the function, called by the thread pool."""
+        try:
+            result = self.function(*self.args, **self.kwargs)
+        except Exception as error:
+            self.signals.failed.emit(str(error))
+        else:
+            self.signals.finished.emit(result)
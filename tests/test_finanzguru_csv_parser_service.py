@@ -0,0 +1,146 @@
+"""Tests for the Finanzguru CSV parser."""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import sankey_generator.services.finanzguru_csv_parser_service as parser_module
+from sankey_generator.models.config import AccountSource, DataFrameFilter, IncomeFilter, IssueCategory
+from sankey_generator.models.sankey_node import SankeyNode
+from sankey_generator.services.finanzguru_csv_parser_service import FinanzguruCsvParserService
+
+CSV_CONTENT = """Referenzkonto;Analyse-Jahr;Analyse-Monat;Betrag;Analyse-Betrag;Analyse-Umbuchung;Analyse-Hauptkategorie;Analyse-Unterkategorie;Verwendungszweck;Beguenstigter/Auftraggeber;Notiz
+IBAN 1;2024;2024-08;2.500,00;Einnahmen;nein;Einnahmen;Gehalt;Lohn August;Employer GmbH;
+IBAN 1;2024;2024-08;12,34;Einnahmen;nein;Einnahmen;Zinsen;Zins/Dividende (Q3);Bank;
+IBAN 2;2024;2024-08;100,00;Einnahmen;nein;Einnahmen;Sonstiges;Erstattung;Someone;
+IBAN 3;2024;2024-08;999,00;Einnahmen;nein;Einnahmen;Gehalt;Lohn August;Employer GmbH;
+IBAN 1;2024;2024-08;500,00;Einnahmen;ja;Umbuchung;Umbuchung;Sparen;Me;
+IBAN 1;2024;2024-07;2.500,00;Einnahmen;nein;Einnahmen;Gehalt;Lohn Juli;Employer GmbH;
+IBAN 1;2024;2024-08;-800,00;Ausgaben;nein;Wohnen;Miete;Miete August;Landlord;
+IBAN 1;2024;2024-08;-1.000,50;Ausgaben;nein;Wohnen;Strom;Abschlag;Stadtwerke;
+IBAN 1;2024;2024-08;-50,00;Ausgaben;nein;Freizeit;Sport;Schwimmbad;Stadt;
+IBAN 2;2024;2024-08;-30,00;Ausgaben;nein;Sport;Verein;Beitrag;Verein;
+IBAN 1;2024;2024-08;-200,00;Ausgaben;nein;Wohnen;Miete;Nachzahlung;Landlord;
+IBAN 1;2024;2024-08;-500,00;Ausgaben;ja;Umbuchung;Umbuchung;Sparen;Me;
+IBAN 1;2024;2024-07;-75,00;Ausgaben;nein;Freizeit;Kino;Kino;Kino;
+"""
+
+
+def _to_tuples(nodes: list[SankeyNode]) -> list[tuple]:
+    """Convert nodes to (label, rounded amount, children) tuples for comparison."""
+    return [(node.label, round(node.amount, 2), _to_tuples(node.linkedNodes)) for node in nodes]
+
+
+class FinanzguruCsvParserServiceTest(unittest.TestCase):
+    """Tests for the Finanzguru CSV parser."""
+
+    def setUp(self):
+        """Write the CSV fixture and configure a parser for it."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        csv_file = os.path.join(temp_dir.name, 'input.csv')
+        with open(csv_file, 'w', encoding='utf-8') as file:
+            file.write(CSV_CONTENT)
+
+        issues_hierarchy = IssueCategory('Analyse-Hauptkategorie')
+        issues_hierarchy.sub_category = IssueCategory('Analyse-Unterkategorie')
+
+        account = AccountSource('Account 1', 'IBAN 1')
+        salary = IncomeFilter('Gehalt', 'Beguenstigter/Auftraggeber')
+        salary.csv_value_filters = ['employer']
+        interest = IncomeFilter('Zinsen', 'Verwendungszweck')
+        # parentheses are matched literally, the row matches both values but is only counted once
+        interest.csv_value_filters = ['zins/dividende (q3)', 'dividende']
+        account.income_filters = [salary, interest]
+
+        self.parser = FinanzguruCsvParserService(
+            issues_hierarchy,
+            'Analyse-Jahr',
+            'Analyse-Monat',
+            'Einnahmen',
+            'Betrag',
+            'Sonstige Einnahmen',
+            'Nicht verwendet',
+        )
+        self.parser.configure_parser(
+            csv_file,
+            [account],
+            [
+                DataFrameFilter('Analyse-Betrag', ['Einnahmen']),
+                DataFrameFilter('Analyse-Umbuchung', ['nein']),
+                DataFrameFilter('Referenzkonto', ['IBAN 1', 'IBAN 2']),
+            ],
+            [
+                DataFrameFilter('Analyse-Betrag', ['Ausgaben']),
+                DataFrameFilter('Analyse-Umbuchung', ['nein']),
+            ],
+        )
+
+    def _assert_month_result(self):
+        """Parse August 2024 and check the income and issue nodes."""
+        root_node = self.parser.parse_csv(2024, 8, 2)
+
+        self.assertEqual(
+            _to_tuples(root_node.incomeNodes),
+            [
+                ('Gehalt', 2500.0, []),
+                ('Zinsen', 12.34, []),
+                ('Sonstige Einnahmen', 100.0, []),
+            ],
+        )
+        self.assertEqual(
+            _to_tuples(root_node.issueNodes),
+            [
+                ('Wohnen', 2000.5, [('Miete', 1000.0, []), ('Strom', 1000.5, [])]),
+                ('Freizeit', 50.0, [('Sport', 50.0, [])]),
+                # 'Sport' is already used as sub category, the main category gets a space prefix and keeps its children
+                (' Sport', 30.0, [('Verein', 30.0, [])]),
+                ('Nicht verwendet', 531.84, []),
+            ],
+        )
+
+    @unittest.skipIf(parser_module.pacsv is None, 'pyarrow is not installed')
+    def test_parse_csv_with_pyarrow(self):
+        """Parse the CSV with pyarrow."""
+        self._assert_month_result()
+
+    def test_parse_csv_without_pyarrow(self):
+        """Parse the CSV with the pandas fallback."""
+        with mock.patch.object(parser_module, 'pacsv', None):
+            self._assert_month_result()
+
+    def test_parse_csv_issue_depth_one(self):
+        """Only the main categories are created for issue depth 1."""
+        root_node = self.parser.parse_csv(2024, 8, 1)
+
+        self.assertEqual(
+            _to_tuples(root_node.issueNodes),
+            [
+                ('Wohnen', 2000.5, []),
+                ('Freizeit', 50.0, []),
+                ('Sport', 30.0, []),
+                ('Nicht verwendet', 531.84, []),
+            ],
+        )
+
+    def test_parse_csv_whole_year(self):
+        """Month 13 analyses the whole year."""
+        root_node = self.parser.parse_csv(2024, 13, 2)
+
+        self.assertEqual(_to_tuples(root_node.incomeNodes)[0], ('Gehalt', 5000.0, []))
+        self.assertEqual(
+            _to_tuples(root_node.issueNodes)[1],
+            ('Freizeit', 125.0, [('Sport', 50.0, []), ('Kino', 75.0, [])]),
+        )
+
+    def test_parse_csv_invalid_issue_depth(self):
+        """Issue depths outside of the hierarchy are rejected."""
+        with self.assertRaises(ValueError):
+            self.parser.parse_csv(2024, 8, 0)
+        with self.assertRaises(ValueError):
+            self.parser.parse_csv(2024, 8, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()